@@ -42,16 +42,27 @@
             -q <commando>   A commando the udp-listener understands. If no query is given the program sends "none"
             --loop          Give here the word "loop" if you want an endliess loop mode, break with ctrl-c
             -l <number of times>    Requires the --loop option to be set. Runs a number of times end ends.
+            --interval <seconds>    Time between the start of two requests in loop mode, default 5.0
+            --batch <n>     In loop mode send n requests per sendmmsg/recvmmsg syscall (Linux), default 1
+                            The n requests go out as one burst, the next batch starts n * --interval later
+            --backend <mmsg | uring>    syscall interface for --batch, uring needs the liburing package, default mmsg
+            --quiet         Do not print the response body, only the status lines
             -i <ns-pid>     Give here the network pid of the container or participant of a running network.
                             This mode only runs with root-rights!
                             This mode has requirements you need to fullfill, read below.
             -c <compose-docker-imagename>   optional to -i you only enter the name of the container to enter the network
             --remote-ip <ip-address>    default 127.0.0.1
             --remote-port <port>    default 44444
+            --recv-timeout <seconds>    how long to wait for an answer, default 2.0
+            --rcvbuf <bytes>        socket receive buffer size, e.g. 1048576 for bursty replies, default system default
+            --sndbuf <bytes>        socket send buffer size, default system default
             --logfile <logfile-name>    default udp_log.json
             --logformat <json | csv>        possible formats are "json" or "csv", default is json
             --log-on <all | success | fail> choose one of the three log options as argument, default is all
-            --timestamp-format <iso | unix> choose one of the three timestamp formats as argument default is iso
+            --timestamp-format <iso | unix | unix-ns> choose one of the three timestamp formats as argument default is iso
+                            unix-ns logs the kernel receive time of the answer in nanoseconds
+            --log-batch <n>     write the logfile every n entries, default 32. In loop mode pending entries
+                            are also written once they are 5 seconds old, checked while waiting for the next request
 
     Entering to a network namespace as participant, this can be for example a running docker-network (mounting into a netowrk namespace)
         1.You need root rights! -> This version requests root rights
@@ -73,13 +84,98 @@ import time
 import ctypes
 import os
 import argparse
-import subprocess
-from datetime import datetime
+import struct
+import atexit
+import selectors
+import signal
+import threading
+import errno
+import functools
+from pathlib import Path
 
-LIBC = ctypes.CDLL("libc.so.6", use_errno=True)
+
+_loads = json.loads
+_dumps = json.dumps
+
+_time_ns = time.time_ns
+_strftime = time.strftime
+
+# get_timestamp rebuilds the date/time prefix only when the second changes
+_iso_second = None
+_iso_prefix = ""
+
+_sel = selectors.DefaultSelector()
+
+# Set by the SIGINT handler. The main thread only polls is_set() every STOP_POLL_SECONDS
+# and never waits on it, set() from the handler would block on the lock held by that wait
+_stop = threading.Event()
+STOP_POLL_SECONDS = 0.1
+
+# Pending log entries as parallel columns, formatted and written together by flush_log
+# once --log-batch entries are collected or LOG_FLUSH_SECONDS passed since the last flush.
+# The response column already holds the JSON fragment in json format.
+_log_ts = []
+_log_query = []
+_log_response = []
+_log_last_flush = 0.0
+LOG_FLUSH_SECONDS = 5.0
+
+# csv lines match csv.writer with QUOTE_ALL. json lines use the separators of json.dumps,
+# but a valid single-line JSON reply is embedded as received: its spacing follows the
+# sender and non-ASCII text is not \u-escaped
+_CSV_FMT = '"%s","%s","%s"\n'
+_JSON_FMT = '{"timestamp": %s, "query": %s, "response": %s}\n'
+
+# Linux only, older socket modules do not export them (see asm-generic/socket.h, linux/in.h).
+# None elsewhere, the option is then not set.
+if sys.platform.startswith("linux"):
+    SO_RXQ_OVFL = getattr(socket, "SO_RXQ_OVFL", 40)
+    SO_TIMESTAMPNS = getattr(socket, "SO_TIMESTAMPNS", 35)
+    IP_MTU_DISCOVER = getattr(socket, "IP_MTU_DISCOVER", 10)
+    IP_PMTUDISC_DONT = getattr(socket, "IP_PMTUDISC_DONT", 0)
+else:
+    SO_RXQ_OVFL = SO_TIMESTAMPNS = IP_MTU_DISCOVER = IP_PMTUDISC_DONT = None
+
+# SO_RXQ_OVFL reports a running total, only the increase since the last reply is new
+_rx_dropped = 0
+
+RECV_SIZE = 4096
+
+# Receive buffer reused for every reply on the single request path
+_rx_buf = bytearray(RECV_SIZE)
+_rx_mv = memoryview(_rx_buf)
+# struct timespec is two native longs, 8 bytes on 32-bit Linux
+_TIMESPEC_SIZE = struct.calcsize("ll")
+# room for the SO_RXQ_OVFL and SO_TIMESTAMPNS messages; CMSG_SPACE does not exist on Windows
+if sys.platform.startswith("linux"):
+    _rx_ancbufsize = socket.CMSG_SPACE(4) + socket.CMSG_SPACE(_TIMESPEC_SIZE)
+else:
+    _rx_ancbufsize = 0
+
+class iovec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+class msghdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(iovec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+class mmsghdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", msghdr), ("msg_len", ctypes.c_uint)]
+
+@functools.cache
+def libc():
+    # loaded on first use, so --help and non-Linux imports skip the dlopen
+    return ctypes.CDLL("libc.so.6", use_errno=True)
 
 def setns(fd, nstype):
-    if LIBC.setns(fd, nstype) != 0:
+    if libc().setns(fd, nstype) != 0:
         errno = ctypes.get_errno()
         raise OSError(errno, os.strerror(errno))
 
@@ -98,7 +194,215 @@ def enter_netns(pid):
         print(f"Failed to enter network namespace: {e}")
         sys.exit(1)
 
+class MmsgBatch:
+    """ Send and receive up to size datagrams per syscall with sendmmsg(2)/recvmmsg(2).
+        All headers, iovecs and receive buffers are allocated once and reused for every batch.
+    """
+    def __init__(self, sock, size, payload):
+        self.fd = sock.fileno()
+        self.size = size
+        self.sendmmsg = libc().sendmmsg
+        self.recvmmsg = libc().recvmmsg
+        self.sendmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(mmsghdr), ctypes.c_uint, ctypes.c_int]
+        self.recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(mmsghdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+
+        # every outgoing message shares the same payload, the socket is connected so no destination
+        self.payload = ctypes.create_string_buffer(payload, len(payload))
+        self.tx_iov = iovec(ctypes.cast(self.payload, ctypes.c_void_p), len(payload))
+        self.tx = (mmsghdr * size)()
+        for m in self.tx:
+            m.msg_hdr.msg_iov = ctypes.pointer(self.tx_iov)
+            m.msg_hdr.msg_iovlen = 1
+
+        self.rx_bufs = [ctypes.create_string_buffer(RECV_SIZE) for _ in range(size)]
+        self.rx_names = [ctypes.create_string_buffer(16) for _ in range(size)]
+        self.rx_iov = (iovec * size)()
+        self.rx = (mmsghdr * size)()
+        for i, m in enumerate(self.rx):
+            self.rx_iov[i].iov_base = ctypes.cast(self.rx_bufs[i], ctypes.c_void_p)
+            self.rx_iov[i].iov_len = RECV_SIZE
+            m.msg_hdr.msg_name = ctypes.cast(self.rx_names[i], ctypes.c_void_p)
+            m.msg_hdr.msg_iov = ctypes.pointer(self.rx_iov[i])
+            m.msg_hdr.msg_iovlen = 1
+
+    def exchange(self, n, timeout):
+        """ Send n requests and collect replies until all arrived or timeout passed.
+            Returns the number of replies and whether the peer refused the requests.
+        """
+        received = 0
+        try:
+            self.send(n)
+            deadline = time.monotonic() + timeout
+            while received < n and wait_readable(deadline - time.monotonic()):
+                received += self.recv(n, received)
+        except ConnectionRefusedError:
+            return received, True
+        return received, False
+
+    def send(self, n):
+        sent = 0
+        while sent < n:
+            count = self.sendmmsg(self.fd, ctypes.byref(self.tx[sent]), n - sent, 0)
+            if count < 0:
+                err = ctypes.get_errno()
+                raise OSError(err, os.strerror(err))
+            sent += count
+
+    def recv(self, n, offset):
+        """ Receive what is queued into slots offset..n-1, returns the number of datagrams. """
+        for m in self.rx[offset:n]:
+            m.msg_hdr.msg_namelen = 16
+        count = self.recvmmsg(self.fd, ctypes.byref(self.rx[offset]), n - offset, socket.MSG_DONTWAIT, None)
+        if count < 0:
+            err = ctypes.get_errno()
+            if err in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return 0
+            raise OSError(err, os.strerror(err))
+        return count
+
+    def reply(self, i):
+        port, ip = struct.unpack_from("!2xH4s", self.rx_names[i])
+        return ctypes.string_at(self.rx_bufs[i], self.rx[i].msg_len), (socket.inet_ntoa(ip), port)
+
+    def close(self):
+        pass
+
+class UringBatch:
+    """ Same interface as MmsgBatch, but submits a whole batch with one io_uring_enter(2)
+        through the optional liburing bindings. Every request is a linked
+        send -> recv -> link timeout chain, so no recv is left pending after a lost reply.
+    """
+    def __init__(self, sock, size, payload):
+        import liburing
+
+        self.uring = liburing
+        self.fd = sock.fileno()
+        self.peer = sock.getpeername()
+        self.payload = payload
+        self.ring = liburing.Ring()
+        # no SQPOLL, a kernel polling thread burns a core and gains nothing for a single socket
+        liburing.io_uring_queue_init(3 * size, self.ring,
+                                     liburing.IORING_SETUP_SINGLE_ISSUER
+                                     | liburing.IORING_SETUP_DEFER_TASKRUN
+                                     | liburing.IORING_SETUP_SUBMIT_ALL
+                                     | liburing.IORING_SETUP_COOP_TASKRUN)
+        self.cqe = liburing.Cqe()
+        self.poll_ts = liburing.timespec(STOP_POLL_SECONDS)
+        self.timeout = None
+        self.rx_bufs = [bytearray(RECV_SIZE) for _ in range(size)]
+        self.rx_done = []
+
+    def exchange(self, n, timeout):
+        L = self.uring
+        if timeout != self.timeout:
+            self.timeout = timeout
+            self.timeout_ts = L.timespec(timeout)
+        for i in range(n):
+            sqe = L.io_uring_get_sqe(self.ring)
+            L.io_uring_prep_send(sqe, self.fd, self.payload)
+            L.io_uring_sqe_set_flags(sqe, L.IOSQE_IO_LINK)
+            sqe.user_data = 3 * i
+            sqe = L.io_uring_get_sqe(self.ring)
+            L.io_uring_prep_recv(sqe, self.fd, self.rx_bufs[i])
+            L.io_uring_sqe_set_flags(sqe, L.IOSQE_IO_LINK)
+            sqe.user_data = 3 * i + 1
+            sqe = L.io_uring_get_sqe(self.ring)
+            L.io_uring_prep_link_timeout(sqe, self.timeout_ts, 0)
+            sqe.user_data = 3 * i + 2
+        L.io_uring_submit(self.ring)
+
+        self.rx_done.clear()
+        refused = False
+        pending = 3 * n
+        while pending and not _stop.is_set():
+            try:
+                L.io_uring_wait_cqe_timeout(self.ring, self.cqe, self.poll_ts)
+            except OSError as e:
+                if e.errno == errno.ETIME:
+                    continue
+                raise
+            cqe = self.cqe[0]
+            user_data = cqe.user_data
+            try:
+                # the bindings raise negative results as OSError
+                res = cqe.res
+            except ConnectionRefusedError:
+                refused = True
+                res = None
+            except OSError:
+                res = None
+            L.io_uring_cqe_seen(self.ring, cqe)
+            pending -= 1
+            if user_data % 3 == 1 and res is not None:
+                self.rx_done.append((user_data // 3, res))
+        return len(self.rx_done), refused
+
+    def reply(self, i):
+        index, nbytes = self.rx_done[i]
+        return bytes(self.rx_bufs[index][:nbytes]), self.peer
+
+    def close(self):
+        self.uring.io_uring_queue_exit(self.ring)
+
+def make_batch(sock, size, payload, backend):
+    if backend == "uring":
+        try:
+            return UringBatch(sock, size, payload)
+        except ImportError:
+            print("liburing is not installed, using sendmmsg/recvmmsg")
+        except OSError as e:
+            print(f"io_uring not available ({e}), using sendmmsg/recvmmsg")
+    try:
+        return MmsgBatch(sock, size, payload)
+    except (AttributeError, OSError):
+        print("sendmmsg/recvmmsg not available, sending requests one by one")
+    return None
+
+def get_process_start_time(pid):
+    """ Start time of pid in clock ticks since boot, None if the process is gone. """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # the command name may contain spaces, fields after it are fixed
+    return stat[stat.rindex(")") + 2:].split()[19]
+
+def read_cached_pid(cache):
+    try:
+        pid, start_time = cache.read_text().split()
+    except (OSError, ValueError):
+        return None
+    # the start time guards against the pid having been reused by another process
+    if start_time != get_process_start_time(pid) or not os.path.exists(f"/proc/{pid}/ns/net"):
+        return None
+    return int(pid)
+
+def write_cached_pid(cache, pid):
+    start_time = get_process_start_time(pid)
+    if start_time is None:
+        return
+    try:
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(f"{pid} {start_time}\n")
+        os.replace(tmp, cache)
+    except OSError as e:
+        print(f"Could not write PID cache {cache}: {e}")
+
 def get_pid_from_compose_name(compose_name):
+    import subprocess
+
+    # docker accepts "/name"; anything else with a separator would escape the cache directory
+    name = compose_name.lstrip("/")
+    if not name or name in (".", "..") or "/" in name or (os.altsep and os.altsep in name):
+        print(f"Invalid container name '{compose_name}'")
+        sys.exit(1)
+    cache = Path.home() / ".cache" / "udptestremote" / f"{name}.pid"
+    pid = read_cached_pid(cache)
+    if pid:
+        print(f"Resolved container '{compose_name}' to PID {pid} (cached)")
+        return pid
     try:
         result = subprocess.run(
             ["docker", "inspect", "-f", "{{.State.Pid}}", compose_name],
@@ -106,58 +410,230 @@ def get_pid_from_compose_name(compose_name):
         )
         pid = int(result.stdout.strip())
         print(f"Resolved container '{compose_name}' to PID {pid}")
+        if pid:
+            write_cached_pid(cache, pid)
         return pid
     except subprocess.CalledProcessError as e:
         print(f"Could not resolve container '{compose_name}': {e.stderr}")
         sys.exit(1)
 
 def get_timestamp(fmt):
-    now = datetime.now()
+    global _iso_second, _iso_prefix
+    ns = _time_ns()
+    second = ns // 1_000_000_000
     if fmt == "unix":
-        return int(now.timestamp())
-    return now.isoformat()
-
-def log_entry(logfile, logformat, query, response, timestamp_format):
-    timestamp = get_timestamp(timestamp_format)
-    if logformat == "csv":
-        with open(logfile, "a") as f:
-            line = f'"{timestamp}","{query}","{response}"\n'
-            f.write(line)
+        return second
+    if fmt == "unix-ns":
+        return ns
+    if second != _iso_second:
+        _iso_prefix = _strftime("%Y-%m-%dT%H:%M:%S", time.localtime(second))
+        _iso_second = second
+    # same layout as datetime.isoformat(): local time with microseconds
+    return "%s.%06d" % (_iso_prefix, ns % 1_000_000_000 // 1000)
+
+def open_log(config):
+    global _log_last_flush
+    # raw O_APPEND fd: every flush is a single write(2), no TextIOWrapper/BufferedWriter in between
+    config.log_fd = os.open(config.logfile, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    atexit.register(os.close, config.log_fd)
+    # registered after close, so atexit runs it first
+    atexit.register(flush_log, config)
+    _log_last_flush = time.monotonic()
+
+def flush_log(config):
+    global _log_last_flush
+    _log_last_flush = time.monotonic()
+    if not _log_ts:
+        return
+    # the query column rarely changes, escape each distinct value once
+    if config.logformat == "csv":
+        queries = {q: csv_field(q) for q in set(_log_query)}
+        lines = [_CSV_FMT % (t, queries[q], csv_field(r)) for t, q, r in zip(_log_ts, _log_query, _log_response)]
     else:  # json
-        with open(logfile, "a") as f:
-            entry = {
-                "timestamp": timestamp,
-                "query": query,
-                "response": response
-            }
-            f.write(json.dumps(entry) + "\n")
-
-def send_and_receive(listen_port, command, remote_ip, remote_port, config):
+        queries = {q: json_string(q) for q in set(_log_query)}
+        if config.timestamp_format == "iso":
+            lines = [_JSON_FMT % ('"' + t + '"', queries[q], r) for t, q, r in zip(_log_ts, _log_query, _log_response)]
+        else:
+            lines = [_JSON_FMT % (t, queries[q], r) for t, q, r in zip(_log_ts, _log_query, _log_response)]
+    data = memoryview("".join(lines).encode("utf-8"))
+    while data:
+        data = data[os.write(config.log_fd, data):]
+    _log_ts.clear()
+    _log_query.clear()
+    _log_response.clear()
+
+def csv_field(s):
+    return s.replace('"', '""') if '"' in s else s
+
+def json_string(s):
+    # plain printable ascii needs no escaping, everything else goes through json.dumps
+    if s.isascii() and s.isprintable() and '"' not in s and "\\" not in s:
+        return '"' + s + '"'
+    return _dumps(s)
+
+def log_entry(config, query, response, json_response=None, timestamp=None):
+    """ response is the reply text, json_response the parsed reply if it was valid JSON.
+        The json log nests a valid reply as object, reusing the reply text when it is a single line.
+        timestamp overrides the current time, e.g. with the kernel receive time.
+    """
+    if timestamp is None:
+        timestamp = get_timestamp(config.timestamp_format)
+    if config.logformat == "json":
+        if json_response is None:
+            response = json_string(response)
+        elif "\n" in response or "\r" in response:
+            response = _dumps(json_response)
+    _log_ts.append(timestamp)
+    _log_query.append(query)
+    _log_response.append(response)
+    if len(_log_ts) >= config.log_batch:
+        flush_log(config)
+    else:
+        flush_log_if_due(config)
+
+def flush_log_if_due(config):
+    if _log_ts and time.monotonic() - _log_last_flush >= LOG_FLUSH_SECONDS:
+        flush_log(config)
+
+def set_buffer_size(sock, optname, size, name):
+    sock.setsockopt(socket.SOL_SOCKET, optname, size)
+    actual = sock.getsockopt(socket.SOL_SOCKET, optname)
+    # Linux reports twice the requested size to account for bookkeeping overhead
+    if actual < size:
+        print(f"Warning: {name} clamped to {actual} bytes (requested {size}), "
+              f"raise net.core.{'rmem_max' if optname == socket.SO_RCVBUF else 'wmem_max'}")
+
+def resolve_remote(remote_ip, remote_port):
+    try:
+        return socket.gethostbyname(remote_ip), remote_port
+    except socket.gaierror as e:
+        print(f"Could not resolve remote address '{remote_ip}': {e}")
+        sys.exit(1)
+
+def set_optional_option(sock, level, optname, value):
+    """ Set a platform specific option, returns False if it is unknown or the kernel refused it. """
+    if optname is None:
+        return False
+    try:
+        sock.setsockopt(level, optname, value)
+    except OSError:
+        return False
+    return True
+
+def make_socket(listen_port, remote_addr, rcvbuf, sndbuf, timestamps=False):
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    # only when given, the system default needs no tuning and must not cause a clamp warning
+    if rcvbuf:
+        set_buffer_size(sock, socket.SO_RCVBUF, rcvbuf, "SO_RCVBUF")
+    if sndbuf:
+        set_buffer_size(sock, socket.SO_SNDBUF, sndbuf, "SO_SNDBUF")
+    set_optional_option(sock, socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
+    # small queries never need fragmentation, skip path MTU bookkeeping
+    set_optional_option(sock, socket.IPPROTO_IP, IP_MTU_DISCOVER, IP_PMTUDISC_DONT)
+    if timestamps and not set_optional_option(sock, socket.SOL_SOCKET, SO_TIMESTAMPNS, 1):
+        print("Warning: kernel receive timestamps (SO_TIMESTAMPNS) not available, "
+              "logging the time the answer was processed instead")
     sock.bind(("", listen_port))
-    sock.settimeout(2.0)
+    # fixes the peer: no address handling per send and datagrams from other hosts are dropped
+    sock.connect(remote_addr)
+    sock.setblocking(False)
+    _sel.register(sock, selectors.EVENT_READ)
+    return sock
+
+def close_socket(sock):
+    _sel.unregister(sock)
+    sock.close()
 
+def wait_readable(timeout):
+    deadline = time.monotonic() + timeout
+    while not _stop.is_set():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        if _sel.select(timeout=min(remaining, STOP_POLL_SECONDS)):
+            return True
+    return False
+
+def drain_socket(sock):
+    """ Discard replies that arrived after their request timed out, they belong to an earlier request. """
+    while True:
+        try:
+            sock.recv_into(_rx_buf)
+        except BlockingIOError:
+            return
+        except ConnectionRefusedError:
+            # pending ICMP error of an earlier request
+            pass
+
+def send_and_receive(sock, command, command_bytes, config):
+    global _rx_dropped
     try:
-        sock.sendto(command.encode(), (remote_ip, remote_port))
-        data, addr = sock.recvfrom(4096)
-        print(f"Antwort von {addr[0]}:{addr[1]}")
+        drain_socket(sock)
+        sock.send(command_bytes)
+        if not wait_readable(config.recv_timeout):
+            if not _stop.is_set():
+                handle_timeout(command, config)
+            return
+        nbytes, ancdata, flags, addr = sock.recvmsg_into([_rx_buf], _rx_ancbufsize)
+        data = _rx_mv[:nbytes].tobytes()
+        timestamp = None
+        for level, ctype, cdata in ancdata:
+            if level == socket.SOL_SOCKET and ctype == SO_RXQ_OVFL:
+                dropped = struct.unpack("I", cdata[:4])[0]
+                if dropped > _rx_dropped:
+                    print(f"Warning: kernel dropped {dropped - _rx_dropped} datagrams on this socket")
+                    _rx_dropped = dropped
+            elif level == socket.SOL_SOCKET and ctype == SO_TIMESTAMPNS:
+                sec, nsec = struct.unpack("ll", cdata[:_TIMESPEC_SIZE])
+                timestamp = sec * 1_000_000_000 + nsec
+        handle_reply(data, addr, command, config, not config.quiet, timestamp)
+    except ConnectionRefusedError:
+        handle_refused(command, config)
+
+def send_and_receive_batch(sock, batch, n, command, config):
+    """ Send n requests and collect the replies with a MmsgBatch or UringBatch. """
+    drain_socket(sock)
+    received, refused = batch.exchange(n, config.recv_timeout)
+    for i in range(received):
+        data, addr = batch.reply(i)
+        handle_reply(data, addr, command, config, False)
+    if not _stop.is_set():
+        for _ in range(n - received):
+            if refused:
+                handle_refused(command, config)
+            else:
+                handle_timeout(command, config)
+
+def handle_reply(data, addr, command, config, pretty, timestamp=None):
+    print(f"Antwort von {addr[0]}:{addr[1]}")
+    # only objects and arrays are expected, anything else is not worth a parse attempt
+    if data.lstrip()[:1] in (b"{", b"["):
         try:
-            json_data = json.loads(data.decode())
-            response_pretty = json.dumps(json_data, indent=2)
-            print(response_pretty)
-            if config.logfile and config.log_on in ["all", "success"]:
-                log_entry(config.logfile, config.logformat, command, json_data, config.timestamp_format)
+            json_data = _loads(data)
         except json.JSONDecodeError:
-            print("Antwort ist kein gültiges JSON:")
-            print(data.decode())
-            if config.logfile and config.log_on in ["all", "fail"]:
-                log_entry(config.logfile, config.logformat, command, data.decode(), config.timestamp_format)
-    except socket.timeout:
-        print("Keine Antwort empfangen (Timeout)")
-        if config.logfile and config.log_on in ["all", "fail"]:
-            log_entry(config.logfile, config.logformat, command, "Timeout", config.timestamp_format)
-    finally:
-        sock.close()
+            pass
+        else:
+            if pretty:
+                print(_dumps(json_data, indent=2))
+            if config.logfile and config.log_on in ["all", "success"]:
+                log_entry(config, command, data.decode(), json_data, timestamp)
+            return
+    text = data.decode()
+    print("Antwort ist kein gültiges JSON:")
+    if pretty:
+        print(text)
+    if config.logfile and config.log_on in ["all", "fail"]:
+        log_entry(config, command, text, timestamp=timestamp)
+
+def handle_timeout(command, config):
+    print("Keine Antwort empfangen (Timeout)")
+    if config.logfile and config.log_on in ["all", "fail"]:
+        log_entry(config, command, "Timeout")
+
+def handle_refused(command, config):
+    print("Keine Antwort empfangen (Port nicht erreichbar)")
+    if config.logfile and config.log_on in ["all", "fail"]:
+        log_entry(config, command, "Refused")
 
 def main():
     parser = argparse.ArgumentParser(description="UDP Cyberbox Test Client")
@@ -165,45 +641,103 @@ def main():
     parser.add_argument("-q", "--query", default="none")
     parser.add_argument("--loop", action="store_true")
     parser.add_argument("-l", "--repeat", type=int)
+    parser.add_argument("--interval", type=float, default=5.0)
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--backend", choices=["mmsg", "uring"], default="mmsg")
+    parser.add_argument("--quiet", action="store_true")
     parser.add_argument("-i", "--ns-pid", type=int)
     parser.add_argument("-c", "--compose-name")
     parser.add_argument("--remote-ip", default="127.0.0.1")
     parser.add_argument("--remote-port", type=int, default=44444)
+    parser.add_argument("--recv-timeout", type=float, default=2.0)
+    parser.add_argument("--rcvbuf", type=int)
+    parser.add_argument("--sndbuf", type=int)
 
     parser.add_argument("--logfile", nargs="?", const="udp_log.json")
     parser.add_argument("--logformat", choices=["json", "csv"], default="json")
     parser.add_argument("--log-on", choices=["all", "success", "fail"], default="all")
-    parser.add_argument("--timestamp-format", choices=["iso", "unix"], default="iso")
+    parser.add_argument("--timestamp-format", choices=["iso", "unix", "unix-ns"], default="iso")
+    parser.add_argument("--log-batch", type=int, default=32)
 
     args = parser.parse_args()
 
+    signal.signal(signal.SIGINT, lambda *_: _stop.set())
+
+    if args.logfile:
+        open_log(args)
+
+    query_bytes = args.query.encode("utf-8")
+
     if args.compose_name:
         args.ns_pid = get_pid_from_compose_name(args.compose_name)
 
     if args.ns_pid:
         enter_netns(args.ns_pid)
 
+    remote_addr = resolve_remote(args.remote_ip, args.remote_port)
+
+    def wait_until(deadline):
+        # also wakes up to write log entries that are pending for LOG_FLUSH_SECONDS
+        while not _stop.is_set():
+            if args.logfile:
+                flush_log_if_due(args)
+            now = time.monotonic()
+            if now >= deadline:
+                return
+            wake = deadline
+            if _log_ts:
+                wake = min(wake, _log_last_flush + LOG_FLUSH_SECONDS)
+            # sleep in slices instead of _stop.wait(), see the note at _stop
+            time.sleep(min(wake - now, STOP_POLL_SECONDS))
+
     def loop_handler():
-        if args.repeat:
-            print(f"Looping {args.repeat} times...")
-            for i in range(args.repeat):
-                print(f"▶ Request {i + 1}/{args.repeat}")
-                send_and_receive(args.port, args.query, args.remote_ip, args.remote_port, args)
-                time.sleep(5)
-        else:
-            print("Looping until interrupted (CTRL+C)")
-            try:
-                while True:
-                    send_and_receive(args.port, args.query, args.remote_ip, args.remote_port, args)
-                    time.sleep(5)
-            except KeyboardInterrupt:
+        sock = make_socket(args.port, remote_addr, args.rcvbuf, args.sndbuf, args.timestamp_format == "unix-ns")
+        batch = make_batch(sock, args.batch, query_bytes, args.backend) if args.batch > 1 else None
+        try:
+            if args.repeat:
+                print(f"Looping {args.repeat} times...")
+            else:
+                print("Looping until interrupted (CTRL+C)")
+            t0 = time.monotonic()
+            sent = 0
+            while not _stop.is_set() and (not args.repeat or sent < args.repeat):
+                if batch:
+                    # the interval still applies per request, a batch of n waits n intervals
+                    n = min(args.batch, args.repeat - sent) if args.repeat else args.batch
+                    if args.repeat:
+                        print(f"▶ Requests {sent + 1}-{sent + n}/{args.repeat}")
+                    try:
+                        send_and_receive_batch(sock, batch, n, args.query, args)
+                    except OSError as e:
+                        if e.errno != errno.ENOSYS:
+                            raise
+                        print("Batch mode not supported by the kernel, sending requests one by one")
+                        batch.close()
+                        batch = None
+                        continue
+                else:
+                    n = 1
+                    if args.repeat:
+                        print(f"▶ Request {sent + 1}/{args.repeat}")
+                    send_and_receive(sock, args.query, query_bytes, args)
+                sent += n
+                wait_until(t0 + sent * args.interval)
+            if _stop.is_set():
                 print("\nLoop interrupted by user.")
+        finally:
+            if batch:
+                batch.close()
+            close_socket(sock)
 
     if args.loop:
         loop_handler()
     else:
         print(f"Sending '{args.query}' to {args.remote_ip}:{args.remote_port}, listening on {args.port}")
-        send_and_receive(args.port, args.query, args.remote_ip, args.remote_port, args)
+        sock = make_socket(args.port, remote_addr, args.rcvbuf, args.sndbuf, args.timestamp_format == "unix-ns")
+        try:
+            send_and_receive(sock, args.query, query_bytes, args)
+        finally:
+            close_socket(sock)
 
 if __name__ == "__main__":
     main()